@@ -2,8 +2,10 @@
 Lightweight NL→SQL pipeline.
 
 ✓  Detect if a question targets the DB.
-✓  Pick relevant tables (BM25).
-✓  Build a compact schema snippet the SQL LLM can see.
+✓  Reuse SQL of a near-duplicate past question (semantic cache).
+✓  Bind literals ("bhestan") to columns via the entity value index.
+✓  Pick relevant tables (BM25 + entity boost).
+✓  Build a token-budgeted schema snippet the SQL LLM can see.
 ✓  Ask the SQL model for a SELECT.
 ✓  Run it read-only and pretty-print the DataFrame.
 """
@@ -16,6 +18,7 @@ from textwrap import dedent
 from typing import Any, Dict, List
 
 from dotenv import load_dotenv
+from sqlalchemy.exc import DataError, ProgrammingError
 
 load_dotenv()
 
@@ -23,8 +26,11 @@ load_dotenv()
 from llm.sql_generation import generate_sql_for_point_machines, SQLGenError
 from semantic_schema import schema_retrieval as schema                    # NOTE
 from semantic_schema.schema_retrieval import find_relevant_tables
+from semantic_schema import entity_index
 from llm.plain_chat import chat_completion
+from llm.prompt_utils import build_schema_snippet
 from core.execute_query import run_sql_and_fetch
+from core import semantic_cache
 
 # ── logging ───────────────────────────────────────────────────────────────────
 logging.basicConfig(
@@ -69,7 +75,25 @@ def _get_columns(table: str) -> List[str]:
     return [c["name"] for c in cols_info]
 
 
-def _build_schema_snippet(tables: list[str]) -> str:
+def _build_schema_snippet(
+    tables: list[str],
+    question: str = "",
+    bindings: list[entity_index.Binding] | None = None,
+) -> str:
+    """
+    Relevance-ranked, token-budgeted snippet (see llm/prompt_utils.py).
+
+    • nothing fits the budget → bare table names, never a bigger prompt
+    • tokenizer broken        → plain column dump (logged as an error)
+    """
+    try:
+        return build_schema_snippet(tables, question, bindings=bindings)
+    except ValueError as err:                   # over budget / no columns
+        logging.warning("Budgeted snippet failed (%s); table names only", err)
+        return "\n".join(f"-- {tbl}" for tbl in tables)
+    except Exception as err:  # noqa: BLE001
+        logging.error("Tokenizer unavailable (%s); using full dump", err)
+
     parts = []
     for tbl in tables:
         try:
@@ -81,6 +105,35 @@ def _build_schema_snippet(tables: list[str]) -> str:
     return "\n".join(parts)
 
 
+def _generate_sql(question: str, bindings: list[entity_index.Binding]) -> str | None:
+    """
+    Retrieval → prompt → SQL model.  None if no table matched;
+    raises SQLGenError if the model gives no SELECT.
+    """
+    # 1️⃣  semantic search
+    tables = find_relevant_tables(question, k=4, bindings=bindings)
+    if not tables:
+        return None
+
+    logging.info("Selected tables for %s → %s", question, tables)
+
+    # 2️⃣  prompt & SQL generation
+    prompt = "\n\n".join(
+        [
+            FEW_SHOT,
+            _build_schema_snippet(tables, question, bindings),
+            f"-- Question: {question}",
+            "### Answer\nSELECT",
+        ]
+    )
+    sql = generate_sql_for_point_machines(prompt)
+    logging.info("Generated SQL:\n%s", sql)
+
+    if not sql.lower().lstrip().startswith("select"):
+        raise SQLGenError("Model did not return a SELECT.")
+    return sql
+
+
 # ── 2. main entry point ───────────────────────────────────────────────────────
 def chatbot_answer(question: str) -> str:
     """
@@ -91,33 +144,37 @@ def chatbot_answer(question: str) -> str:
         if not _looks_like_db_question(question):
             return chat_completion(question)
 
-        # 1️⃣  semantic search
-        tables = find_relevant_tables(question, k=4)
-        if not tables:
-            return "⚠️ Sorry, I couldn’t map that to any database tables."
-
-        logging.info("Selected tables for %s → %s", question, tables)
-
-        # 2️⃣  prompt & SQL generation
-        prompt = "\n\n".join(
-            [
-                FEW_SHOT,
-                _build_schema_snippet(tables),
-                f"-- Question: {question}",
-                "### Answer\nSELECT",
-            ]
-        )
-        sql = generate_sql_for_point_machines(prompt)
-        logging.info("Generated SQL:\n%s", sql)
-
-        if not sql.lower().lstrip().startswith("select"):
-            raise SQLGenError("Model did not return a SELECT.")
+        # 0️⃣  literals, then near-duplicate questions
+        bindings = entity_index.lookup(question)
+        if bindings:
+            logging.info("Entity bindings → %s", bindings)
+        sql = semantic_cache.lookup(question, bindings)
+        cached = sql is not None
+        if cached:
+            logging.info("Semantic-cache hit for %s → %s", question, sql)
+        else:
+            sql = _generate_sql(question, bindings)
+            if sql is None:
+                return "⚠️ Sorry, I couldn’t map that to any database tables."
 
         # 3️⃣  execute (read-only)
-        df = run_sql_and_fetch(sql, limit=200)
+        try:
+            df = run_sql_and_fetch(sql, limit=200)
+        except RuntimeError as err:
+            # stale SQL (schema changed) – don't serve it again; an outage
+            # or timeout says nothing about the statement, so keep it
+            if cached and isinstance(err.__cause__, (ProgrammingError, DataError)):
+                semantic_cache.discard(question, bindings)
+            raise
+        logging.info("Semantic cache stats: %s", semantic_cache.stats())
         if df.empty:
             return "ℹ️ Query executed but returned no rows."
 
+        # only SQL that returned rows is cached – an empty result is as likely
+        # to be a wrong literal as a true "nothing there"
+        if not cached:
+            semantic_cache.store(question, sql, bindings)
+
         # 4️⃣  pretty-print
         return "✅ Result:\n\n" + df.to_string(index=False)
 
@@ -0,0 +1,301 @@
+# core/semantic_cache.py
+"""
+Near-duplicate question → SQL cache.
+
+"give all site names", "give all site name" and "list all sites" embed to
+almost the same MiniLM vector, so the second and third reuse the SQL of the
+first instead of paying for retrieval + generation again.
+
+• Embeddings live in one bounded, L2-normalised matrix → one mat-vec per lookup.
+• A hit also needs the same signature: bound entity values, operators
+  (max / min / count / top …) and every remaining word that is not filler,
+  stemmed so "site names" and "sites" agree.  So "max current at surat"
+  never answers "… at bhestan" (even if neither site is in entity_index),
+  "min …" never answers "max …", "… voltage …" never answers
+  "… current …", and "per zone" never answers "per site".
+• Least-recently-used entry is evicted when full.  State is pickled to disk
+  every SEMANTIC_CACHE_SAVE_EVERY stores and at exit.
+• `discard()` drops an entry whose SQL stopped working.
+"""
+from __future__ import annotations
+
+import atexit
+import logging
+import os
+import pathlib
+import pickle
+import re
+from functools import lru_cache
+from typing import Dict, FrozenSet, List
+
+import numpy as np
+
+from semantic_schema import entity_index
+from semantic_schema.schema_retrieval import normalise
+
+# ── 1. config ─────────────────────────────────────────────────────────────────
+CACHE_PATH = pathlib.Path(os.getenv("SEMANTIC_CACHE_PATH", "semantic_cache.pkl"))
+CAPACITY = int(os.getenv("SEMANTIC_CACHE_SIZE", "1024"))
+THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.90"))
+SAVE_EVERY = int(os.getenv("SEMANTIC_CACHE_SAVE_EVERY", "16"))
+EMBED_MODEL = "all-MiniLM-L6-v2"        # same model as build_schema_index.py
+_DIM = 384
+
+# words that change the SQL even when the nouns are identical
+_OPERATORS = {
+    "max": "max", "maximum": "max", "highest": "max", "largest": "max", "peak": "max",
+    "min": "min", "minimum": "min", "lowest": "min", "smallest": "min",
+    "avg": "avg", "average": "avg", "mean": "avg",
+    "sum": "sum", "total": "sum",
+    "count": "count", "many": "count", "number": "count",
+    "top": "top", "first": "top",
+    "last": "latest", "latest": "latest", "recent": "latest", "newest": "latest",
+    "oldest": "earliest", "earliest": "earliest",
+    "distinct": "distinct", "unique": "distinct",
+    "asc": "asc", "ascending": "asc", "desc": "desc", "descending": "desc",
+    "not": "not", "without": "not", "except": "not", "excluding": "not",
+    "each": "group", "per": "group", "by": "group",
+}
+_NUMBERS = {
+    "one": "1", "two": "2", "three": "3", "four": "4", "five": "5",
+    "six": "6", "seven": "7", "eight": "8", "nine": "9", "ten": "10",
+}
+# phrasing that doesn't change the SQL
+_FILLER = {
+    "a", "all", "an", "and", "are", "at", "can", "display", "do", "does",
+    "every", "fetch", "find", "for", "from", "get", "give", "how", "i", "in",
+    "is", "list", "me", "my", "of", "on", "our", "please", "show", "tell",
+    "the", "there", "to", "us", "was", "we", "what", "which", "with", "you",
+    # neutral nouns: "site names" / "site details" / "sites" are one query
+    "data", "detail", "details", "info", "name", "names", "record", "records",
+}
+
+# ── 2. state ──────────────────────────────────────────────────────────────────
+_emb = np.zeros((CAPACITY, _DIM), dtype=np.float32)
+_last_used = np.zeros(CAPACITY, dtype=np.int64)     # LRU clock per slot
+_questions: List[str | None] = [None] * CAPACITY
+_sql: List[str | None] = [None] * CAPACITY
+_signature: List[FrozenSet[str]] = [frozenset()] * CAPACITY
+_slot_of: Dict[str, int] = {}                       # normalised question → slot
+_size = 0
+_clock = 0
+_hits = 0
+_misses = 0
+_unsaved = 0                                        # stores since last save
+
+
+@lru_cache(maxsize=1)
+def _model():
+    from sentence_transformers import SentenceTransformer   # heavy; load on first miss
+
+    return SentenceTransformer(EMBED_MODEL)
+
+
+def _normalise(question: str) -> str:
+    return " ".join(re.findall(r"[a-z0-9]+", question.lower()))
+
+
+@lru_cache(maxsize=256)                 # a miss is embedded again by store()
+def _embed(question: str) -> np.ndarray:
+    return _model().encode(
+        question, normalize_embeddings=True, convert_to_numpy=True
+    ).astype(np.float32)
+
+
+def _signature_of(question: str, bindings: List[entity_index.Binding]) -> FrozenSet[str]:
+    """
+    What must match for two questions to share SQL:
+      • "=value"  for every entity_index binding (canonical, so typos agree)
+      • "op:max"  for operators, with synonyms folded
+      • every other non-filler word, stemmed – column and table words
+        ("voltage", "zone") as well as unknown literals ("bhestan", "03t")
+    """
+    words = _normalise(question).split()
+    bound = {w for b in bindings for w in b.term.split()}
+    sig = {"=" + b.value.lower() for b in bindings}
+    for w in words:
+        if w in bound:
+            continue
+        if w in _OPERATORS:
+            sig.add("op:" + _OPERATORS[w])
+        elif w in _NUMBERS:
+            sig.add(_NUMBERS[w])
+        elif w not in _FILLER:
+            sig.add(normalise(w))
+    return frozenset(sig)
+
+
+def _tick(slot: int) -> None:
+    global _clock
+    _clock += 1
+    _last_used[slot] = _clock
+
+
+# ── 3. persistence ────────────────────────────────────────────────────────────
+def _load() -> None:
+    global _size, _clock
+    if not CACHE_PATH.exists():
+        return
+    try:
+        with CACHE_PATH.open("rb") as fh:
+            data = pickle.load(fh)
+        # newest first, so a smaller CAPACITY keeps the most recent entries
+        order = np.argsort(-np.asarray(data["last_used"]))[:CAPACITY]
+        for slot, src in enumerate(order):
+            _emb[slot] = data["emb"][src]
+            _last_used[slot] = data["last_used"][src]
+            _questions[slot] = data["questions"][src]
+            _sql[slot] = data["sql"][src]
+            _signature[slot] = frozenset(data["signature"][src])
+            _slot_of[_normalise(_questions[slot])] = slot
+    except Exception as err:  # noqa: BLE001 – a bad cache is just a cold cache
+        logging.warning("Ignoring unreadable %s: %s", CACHE_PATH, err)
+        _slot_of.clear()
+        return
+    _size = len(order)
+    _clock = int(_last_used[:_size].max(initial=0))
+
+
+def save() -> None:
+    """Atomically write the cache to SEMANTIC_CACHE_PATH."""
+    global _unsaved
+    tmp = CACHE_PATH.with_suffix(CACHE_PATH.suffix + ".tmp")
+    with tmp.open("wb") as fh:
+        pickle.dump(
+            {
+                "emb": _emb[:_size].copy(),
+                "last_used": _last_used[:_size].copy(),
+                "questions": _questions[:_size],
+                "sql": _sql[:_size],
+                "signature": [sorted(s) for s in _signature[:_size]],
+            },
+            fh,
+        )
+    os.replace(tmp, CACHE_PATH)
+    _unsaved = 0
+
+
+def flush() -> None:
+    """Save if anything changed since the last save (also runs at exit)."""
+    if not _unsaved:
+        return
+    try:
+        save()
+    except OSError as err:
+        logging.warning("Could not persist semantic cache: %s", err)
+
+
+def _changed() -> None:
+    global _unsaved
+    _unsaved += 1
+    if _unsaved >= SAVE_EVERY:
+        flush()
+
+
+# ── 4. public API ─────────────────────────────────────────────────────────────
+def _find(question: str, signature: FrozenSet[str]) -> int | None:
+    """Slot of an equivalent past question, or None."""
+    slot = _slot_of.get(_normalise(question))        # exact rephrasing: no embedding
+    if slot is not None:
+        return slot if _signature[slot] == signature else None
+    if not _size:
+        return None
+
+    sims = _emb[:_size] @ _embed(question)
+    for cand in np.argsort(-sims)[:5]:
+        if sims[cand] < THRESHOLD:
+            break
+        if _signature[cand] == signature:
+            logging.info(
+                "Semantic cache: %r ≈ %r (%.3f)",
+                question, _questions[cand], sims[cand],
+            )
+            return int(cand)
+    return None
+
+
+def lookup(question: str, bindings: List[entity_index.Binding] | None = None) -> str | None:
+    """
+    Return cached SQL for a question that means the same thing, else None.
+    """
+    global _hits, _misses
+    if bindings is None:
+        bindings = entity_index.lookup(question)
+
+    slot = _find(question, _signature_of(question, bindings))
+    if slot is None:
+        _misses += 1
+        return None
+    _hits += 1
+    _tick(slot)
+    return _sql[slot]
+
+
+def store(question: str, sql: str, bindings: List[entity_index.Binding] | None = None) -> None:
+    """
+    Remember SQL that executed successfully for `question`.
+    """
+    global _size
+    if bindings is None:
+        bindings = entity_index.lookup(question)
+    key = _normalise(question)
+
+    slot = _slot_of.get(key)
+    if slot is None:
+        if _size < CAPACITY:
+            slot = _size
+            _size += 1
+        else:                                        # evict least recently used
+            slot = int(np.argmin(_last_used[:_size]))
+            _slot_of.pop(_normalise(_questions[slot] or ""), None)
+        _emb[slot] = _embed(question)
+        _questions[slot] = question
+        _slot_of[key] = slot
+
+    _sql[slot] = sql
+    _signature[slot] = _signature_of(question, bindings)
+    _tick(slot)
+    _changed()
+
+
+def discard(question: str, bindings: List[entity_index.Binding] | None = None) -> bool:
+    """
+    Drop the entry `lookup(question)` would return, e.g. because its SQL
+    failed after a schema change.  True if something was removed.
+    """
+    global _size
+    if bindings is None:
+        bindings = entity_index.lookup(question)
+    slot = _find(question, _signature_of(question, bindings))
+    if slot is None:
+        return False
+
+    _slot_of.pop(_normalise(_questions[slot] or ""), None)
+    last = _size - 1
+    if slot != last:                                 # keep slots 0.._size-1 dense
+        _emb[slot] = _emb[last]
+        _last_used[slot] = _last_used[last]
+        _questions[slot] = _questions[last]
+        _sql[slot] = _sql[last]
+        _signature[slot] = _signature[last]
+        _slot_of[_normalise(_questions[slot] or "")] = slot
+    _questions[last], _sql[last], _signature[last] = None, None, frozenset()
+    _last_used[last] = 0
+    _size = last
+    _changed()
+    return True
+
+
+def stats() -> Dict[str, float]:
+    """Entries, hits, misses and hit rate for this process."""
+    total = _hits + _misses
+    return {
+        "entries": _size,
+        "hits": _hits,
+        "misses": _misses,
+        "hit_rate": _hits / total if total else 0.0,
+    }
+
+
+_load()
+atexit.register(flush)
@@ -3,8 +3,19 @@
 Introspect the DB and write
   • schema_index.json   (full, machine-readable)
   • schema_summary.json (one-liners, human-readable)
+  • entity_index.json   (distinct values of low-cardinality text columns)
+
+Usage:  python generate_schema_index.py [--entities-only]
+
+entity_index.json is refreshed per table: a table's text columns are only
+re-read when its change signal moved – the row count from
+sys.dm_db_partition_stats (metadata, no scan) plus MAX() of whichever of
+LastModifiedDate / CreatedDate / DeletedDate it has.  In-place updates to
+tables without those audit columns are picked up by a full rebuild only
+(delete entity_index.json).
 """
 
+import argparse
 import json
 import os
 from collections import defaultdict
@@ -16,6 +27,8 @@ import pandas as pd
 from dotenv import load_dotenv
 from sqlalchemy import create_engine, inspect, text
 
+from semantic_schema.entity_index import is_entity_column
+
 # ── env / connection ─────────────────────────────────────────────────
 load_dotenv()
 URL = os.getenv("DATABASE_URL")
@@ -25,6 +38,10 @@ if not URL:
 engine = create_engine(URL, connect_args={"connect_timeout": 10}, echo=False)
 insp = inspect(engine)
 
+ENTITY_MAX_DISTINCT = int(os.getenv("ENTITY_MAX_DISTINCT", "500"))
+ENTITY_MAX_LEN = 64                          # longer strings are prose, not names
+_AUDIT_COLUMNS = ("LastModifiedDate", "CreatedDate", "DeletedDate")
+
 # ── helpers ─────────────────────────────────────────────────────────
 def _sample_values(table: str, column: str, limit: int = 5) -> List[str]:
     """Collect up to `limit` non-null samples, already converted to str."""
@@ -36,7 +53,8 @@ def _sample_values(table: str, column: str, limit: int = 5) -> List[str]:
         with engine.begin() as conn:
             rows = conn.execute(sql).fetchall()
         return [str(r[0]) for r in rows]          # <-- stringify here
-    except Exception:
+    except Exception as err:
+        print(f"⚠️  no samples for {table}.{column}: {err}")
         return []
 
 
@@ -59,8 +77,122 @@ def _collect_schema() -> Dict[str, Any]:
     return schema
 
 
+def _table_signal(table: str, columns: List[str]) -> List[str] | None:
+    """Row count (metadata) + MAX() of the audit date columns the table has."""
+    maxes = "".join(
+        f", (SELECT MAX([{c}]) FROM [{table}])"
+        for c in _AUDIT_COLUMNS if c in columns
+    )
+    sql = text(
+        "SELECT (SELECT SUM(row_count) FROM sys.dm_db_partition_stats "
+        f"WHERE object_id = OBJECT_ID(:tbl) AND index_id IN (0, 1)){maxes}"
+    )
+    try:
+        with engine.begin() as conn:
+            row = conn.execute(sql, {"tbl": f"[{table}]"}).fetchone()
+        return [str(v) for v in row]
+    except Exception as err:
+        print(f"⚠️  no change signal for {table} (will rescan): {err}")
+        return None
+
+
+def _distinct_values(table: str, column: str) -> List[str] | None:
+    """
+    All distinct short values, or None if there are more than the cap.
+    Query errors propagate – the caller must not mistake them for "empty".
+    """
+    sql = text(
+        f"SELECT DISTINCT TOP {ENTITY_MAX_DISTINCT + 1} [{column}] FROM [{table}] "
+        f"WHERE [{column}] IS NOT NULL AND LEN([{column}]) <= {ENTITY_MAX_LEN}"
+    )
+    with engine.begin() as conn:
+        rows = conn.execute(sql).fetchall()
+    if len(rows) > ENTITY_MAX_DISTINCT:
+        return None
+    return sorted({str(r[0]).strip() for r in rows} - {""})
+
+
+def _collect_entities(
+    schema: Dict[str, Any], previous: Dict[str, Any]
+) -> Dict[str, Any]:
+    """
+    One entry per entity text column, keyed "Table.Column".  A table whose
+    signal is unchanged keeps its entries from `previous` without a scan.
+    Columns over ENTITY_MAX_DISTINCT are kept with no values, so they are
+    not probed again until the table changes.  If any column of a table
+    fails to read, the table is saved without a signal (rescanned next run)
+    and that column keeps its previous values.
+    """
+    entities: Dict[str, Any] = {}
+    for table, meta in schema.items():
+        columns = [c["name"] for c in meta["columns"]]
+        wanted = [
+            c["name"] for c in meta["columns"]
+            if is_entity_column(c["name"], c["type"])
+        ]
+        if not wanted:
+            continue
+
+        signal = _table_signal(table, columns)
+        old = [previous.get(f"{table}.{c}") for c in wanted]
+        if signal is not None and all(o and o.get("signal") == signal for o in old):
+            entities.update({f"{table}.{c}": o for c, o in zip(wanted, old)})
+            continue
+
+        fresh: Dict[str, Any] = {}
+        for column, o in zip(wanted, old):
+            try:
+                values = _distinct_values(table, column)
+            except Exception as err:
+                print(f"⚠️  could not read {table}.{column}: {err}")
+                signal = None
+                values = (o or {}).get("values", [])
+            fresh[f"{table}.{column}"] = {
+                "table": table,
+                "column": column,
+                "values": values or [],
+            }
+        for entry in fresh.values():
+            entry["signal"] = signal
+        entities.update(fresh)
+    return entities
+
+
+def _write_entity_index(schema_index: Dict[str, Any]) -> None:
+    try:
+        with open("entity_index.json", encoding="utf-8") as fh:
+            previous = json.load(fh)
+    except (FileNotFoundError, json.JSONDecodeError):
+        previous = {}
+
+    entities = _collect_entities(schema_index, previous)
+    # tmp + rename: the running bot re-reads this file whenever it changes
+    with open("entity_index.json.tmp", "w", encoding="utf-8") as fh:
+        json.dump(entities, fh, indent=2, ensure_ascii=False)
+    os.replace("entity_index.json.tmp", "entity_index.json")
+
+    reused = sum(1 for k, v in entities.items() if previous.get(k) is v)
+    print(
+        f"✅  wrote {len(entities):,} columns to entity_index.json "
+        f"({reused:,} from unchanged tables)"
+    )
+
+
 # ── main ────────────────────────────────────────────────────────────
 def main() -> None:
+    ap = argparse.ArgumentParser(description="Introspect the DB and write the schema indexes.")
+    ap.add_argument(
+        "--entities-only",
+        action="store_true",
+        help="refresh entity_index.json from the existing schema_index.json",
+    )
+    args = ap.parse_args()
+
+    if args.entities_only:
+        with open("schema_index.json", encoding="utf-8") as fh:
+            _write_entity_index(json.load(fh))
+        return
+
     schema_index = _collect_schema()
 
     # 1) full index ─── default=str => auto-serialize datetime, Decimal, etc.
@@ -76,6 +208,9 @@ def main() -> None:
 
     print(f"✅  wrote {len(schema_index):,} tables to schema_index.json")
 
+    # 3) literal → column index
+    _write_entity_index(schema_index)
+
 
 if __name__ == "__main__":
     main()
@@ -1,5 +1,15 @@
 # llm/prompt_utils.py
-from typing import List, Dict
+from __future__ import annotations
+
+import os
+import re
+from functools import lru_cache
+from typing import List, Dict, Tuple
+
+from llm.tokenizer import get_tokenizer
+from semantic_schema import schema_retrieval as schema
+from semantic_schema import entity_index
+from semantic_schema.entity_index import Binding
 
 # 3-shot prompt taken from the original paper / Defog examples
 FEW_SHOT = """-- Example 1
@@ -23,18 +33,159 @@ JOIN Site s ON s.Id = pmd.SiteId
 WHERE s.Name ILIKE 'surat';
 """
 
-def build_schema_snippet(tables: list[str]) -> str:
+# ── token-budgeted schema snippet ─────────────────────────────────────────────
+SCHEMA_TOKEN_BUDGET = int(os.getenv("SCHEMA_TOKEN_BUDGET", "512"))
+
+_TEXT_TYPES = ("CHAR", "TEXT")           # NVARCHAR, VARCHAR, NCHAR, NTEXT …
+_MAX_SAMPLES = 3
+
+# one fragment = (text, n_tokens); the leading ", " is part of the fragment
+Fragment = Tuple[str, int]
+
+
+def _n_tokens(text: str) -> int:
+    return len(get_tokenizer()(text, add_special_tokens=False)["input_ids"])
+
+
+def _short_type(col: Dict) -> str:
+    """NVARCHAR(200) COLLATE "SQL_Latin1…"  →  NVARCHAR(200)"""
+    return col.get("type", "").split(" COLLATE", 1)[0].strip()
+
+
+def _is_text(col: Dict) -> bool:
+    return any(t in _short_type(col).upper() for t in _TEXT_TYPES)
+
+
+def _samples(col: Dict) -> List[str]:
+    """Distinct, non-numeric sample values (numbers don't help the model)."""
+    seen: List[str] = []
+    for v in col.get("sample_values") or []:
+        v = str(v).strip()
+        if not v or v in seen or re.fullmatch(r"[-\d.:\s]+", v):
+            continue
+        seen.append(v)
+        if len(seen) == _MAX_SAMPLES:
+            break
+    return seen
+
+
+@lru_cache(maxsize=512)
+def _table_fragments(table: str) -> Tuple[Fragment, Fragment, Tuple[Tuple[Fragment, Fragment | None], ...]]:
     """
-    For each table include first 6 columns (otherwise prompt gets huge).
-    Robust against tables with 0 columns.
+    Tokenise a table once and keep the pieces:
+
+        (open, close, ((plain, with_samples | None), …))
+
+    `open` is "-- Table(" and `close` is ")" + newline; every column fragment carries
+    its own leading ", " so the snippet is a plain concatenation and its
+    length is the sum of the cached token counts.
     """
-    lines = []
-    for t in tables:
+    def frag(text: str) -> Fragment:
+        return text, _n_tokens(text)
+
+    cols = []
+    for i, col in enumerate(schema.describe_table(table)):
+        sep = "" if i == 0 else ", "
+        plain = f"{sep}{col['name']} {_short_type(col)}".rstrip()
+        samples = _samples(col) if _is_text(col) else []
+        rich = (
+            frag(plain + " e.g. " + "|".join(f"'{v}'" for v in samples))
+            if samples else None
+        )
+        cols.append((frag(plain), rich))
+    return frag(f"-- {table}("), frag(")\n"), tuple(cols)
+
+
+def _column_score(col: Dict, q_tokens: set[str], bound: bool = False) -> float:
+    """
+    Relevance of one column to the question:
+      • literal bound to it by entity_index     +6
+      • name token hit (Name ↔ "names")         +3
+      • sample value mentioned in the question  +3
+      • key column (Id / …Id) – needed for joins +1
+    """
+    name = col["name"]
+    parts = schema.identifier_tokens(name)
+    q_norm = {schema.normalise(q) for q in q_tokens}
+
+    score = 6.0 if bound else 0.0
+    if parts & q_norm:
+        score += 3
+    if any(schema.normalise(str(v)) in q_norm for v in col.get("sample_values") or []):
+        score += 3
+    if name == "Id" or name.endswith("Id"):
+        score += 1
+    return score
+
+
+def build_schema_snippet(
+    tables: list[str],
+    question: str = "",
+    budget: int | None = None,
+    bindings: List[Binding] | None = None,
+) -> str:
+    """
+    Pack the most relevant columns of `tables` into `budget` tokens
+    (default: $SCHEMA_TOKEN_BUDGET) as measured by the SQL model's tokenizer.
+
+    Columns are picked greedily by relevance to `question` across all tables;
+    tables earlier in the list win ties.  Columns that `bindings` (from
+    semantic_schema.entity_index) point at rank first, and their
+    "-- 'x' means T.C = 'v'" hints are appended – paid for out of the same
+    budget (at most half of it).  Text columns that matter to the question
+    also get a few sample values.  Output keeps the schema order.
+    """
+    budget = SCHEMA_TOKEN_BUDGET if budget is None else budget
+    q_tokens = schema.tokenise(question)
+    bound = {(b.table, b.column) for b in bindings or ()}
+
+    # 0) literal hints first – short, and the most useful lines we have
+    hints, used = [], 0
+    for b in bindings or ():
+        line = entity_index.describe([b])
+        cost = _n_tokens(("\n" if hints else "\n\n") + line)   # incl. separator
+        if used + cost > budget // 2:
+            break
+        hints.append(line)
+        used += cost
+
+    # 1) candidates: (score, table_rank, col_idx)
+    frags, candidates = {}, []
+    for rank, t in enumerate(tables):
         cols = schema.describe_table(t)
         if not cols:                      # safety net
             continue
-        col_names = ", ".join(c["name"] for c in cols[:6])
-        lines.append(f"- {t}({col_names})")
-    if not lines:
+        frags[t] = _table_fragments(t)
+        for i, col in enumerate(cols):
+            score = _column_score(col, q_tokens, (t, col["name"]) in bound)
+            candidates.append((score, rank, i))
+    if not candidates:
         raise ValueError("No usable columns found for chosen tables.")
-    return "\n".join(lines)
+    candidates.sort(key=lambda c: (-c[0], c[1], c[2]))
+
+    # 2) greedy packing – a table's "-- T(" … ")" is paid for with its first column
+    picked: Dict[str, Dict[int, Fragment]] = {}
+    for score, rank, i in candidates:
+        t = tables[rank]
+        open_, close, cols = frags[t]
+        plain, rich = cols[i]
+        overhead = 0 if t in picked else open_[1] + close[1]
+        options = (rich, plain) if (rich and score >= 3) else (plain,)
+        for choice in options:
+            if used + overhead + choice[1] <= budget:
+                picked.setdefault(t, {})[i] = choice
+                used += overhead + choice[1]
+                break
+
+    if not picked:
+        raise ValueError(f"Schema snippet does not fit in {budget} tokens.")
+
+    # 3) assemble in retrieval / schema order
+    out = []
+    for t in tables:
+        if t not in picked:
+            continue
+        open_, close, _ = frags[t]
+        body = "".join(picked[t][i][0] for i in sorted(picked[t]))
+        out.append(open_[0] + body.lstrip(", ") + close[0])
+    return "\n\n".join(p for p in ("".join(out).rstrip("\n"), "\n".join(hints)) if p)
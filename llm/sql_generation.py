@@ -1,9 +1,9 @@
 # llm/sql_generation.py
 import os, re, torch
-from transformers import AutoTokenizer, AutoModelForCausalLM, BitsAndBytesConfig
+from transformers import AutoModelForCausalLM, BitsAndBytesConfig
 
 # ── 1. Model choice ───────────────────────────────────────────────────────────
-SQL_MODEL = os.getenv("SQL_MODEL", "defog/llama-3-sqlcoder-8b")
+from llm.tokenizer import SQL_MODEL, get_tokenizer
 
 # ── 2. Device & dtype ─────────────────────────────────────────────────────────
 if torch.cuda.is_available():
@@ -15,7 +15,7 @@ else:
     dtype = torch.float32
 
 print(f"Loading {SQL_MODEL!r} on {device} ({dtype}) …", flush=True)
-tok = AutoTokenizer.from_pretrained(SQL_MODEL, use_fast=True)
+tok = get_tokenizer()
 model = AutoModelForCausalLM.from_pretrained(
     SQL_MODEL,
     torch_dtype=dtype,
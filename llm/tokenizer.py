@@ -0,0 +1,16 @@
+# llm/tokenizer.py
+"""
+The SQL model's tokenizer on its own – no weights.  Shared by
+llm/sql_generation.py (generation) and llm/prompt_utils.py (token budget).
+"""
+import os
+from functools import lru_cache
+
+SQL_MODEL = os.getenv("SQL_MODEL", "defog/llama-3-sqlcoder-8b")
+
+
+@lru_cache(maxsize=1)
+def get_tokenizer():
+    from transformers import AutoTokenizer   # keep the import cheap until needed
+
+    return AutoTokenizer.from_pretrained(SQL_MODEL, use_fast=True)
@@ -0,0 +1,247 @@
+"""
+semantic_schema/entity_index.py
+───────────────────────────────
+Distinct-value index over low-cardinality text columns (site names, asset
+types, zones …) written by generate_schema_index.py → entity_index.json.
+
+    lookup("give maximum current at bhestan")
+        → [Binding(table='Site', column='Name', value='Bhestan', term='bhestan', exact=True)]
+
+Exact hits are one dict probe; fuzzy hits (1 edit, e.g. "bhestn") use a
+SymSpell-style delete map, so both stay in the microsecond range.
+
+The index is loaded on the first lookup() and reloaded when the file
+changes.  Each term binds to at most one column.  Free-text, remark and credential
+columns are never indexed.  Terms that name a table or column themselves,
+or that match too many columns, are not bound.
+"""
+
+from __future__ import annotations
+import json
+import logging
+import os
+import pathlib
+import re
+from typing import Dict, Iterable, List, NamedTuple, Set, Tuple
+
+# ── 1. config ─────────────────────────────────────────────────────────────
+_index_path = pathlib.Path(os.getenv("ENTITY_INDEX_PATH", "entity_index.json"))
+_schema_path = pathlib.Path("schema_index.json")      # fallback seed
+
+_MAX_NGRAM = 4          # "mb power cabin" is three tokens
+_MIN_FUZZY_LEN = 4      # no fuzzy matching for short codes like "03t"
+_MIN_LEN = 3            # "1", "ok", "::1" say nothing
+_MAX_LEN = 64           # longer strings are prose, not names
+_MAX_COLUMNS = 3        # a term found in more columns than this is noise
+_TEXT_TYPES = ("CHAR", "TEXT")
+
+# free text, credentials and technical strings – never entity values.
+# Whole words of the column name: "MACId" is out, "PointMachine" is not.
+_EXCLUDED_WORDS = {
+    "password", "passwd", "pwd", "hash", "salt", "token", "secret", "otp", "key",
+    "remark", "description", "comment", "note", "message", "cause", "breach",
+    "reason", "path", "url", "link", "image", "ip", "address", "mac", "email",
+    "phone", "mobile", "json",
+}
+
+# words that show up in questions but are never literals
+_STOPWORDS = {
+    "a", "an", "all", "and", "any", "are", "at", "average", "avg", "by",
+    "count", "each", "for", "from", "get", "give", "how", "in", "is", "list",
+    "many", "max", "maximum", "mean", "min", "minimum", "name", "names", "no",
+    "of", "on", "or", "per", "select", "show", "site", "sites", "sum", "the",
+    "to", "top", "total", "what", "where", "which", "with", "yes",
+}
+
+
+class Binding(NamedTuple):
+    table: str
+    column: str
+    value: str          # canonical value as stored in the DB
+    term: str           # what the question actually said
+    exact: bool
+    score: float        # specificity in (0, 1]: exact and unambiguous → 1
+
+
+# ── 2. in-memory structures ───────────────────────────────────────────────
+_exact: Dict[str, Set[Tuple[str, str, str]]] = {}    # key → {(table, col, value)}
+_deletes: Dict[str, Set[str]] = {}                   # 1-deletion → {key}
+_mtime: float | None = None
+
+
+def _key(value: str) -> str:
+    """'MB  Power-Cabin' → 'mb power cabin'"""
+    return " ".join(re.findall(r"[a-z0-9]+", value.lower()))
+
+
+def _one_deletes(key: str) -> Set[str]:
+    return {key[:i] + key[i + 1:] for i in range(len(key))}
+
+
+def _within_one_edit(a: str, b: str) -> bool:
+    """True if a and b differ by one insert / delete / substitute."""
+    if a == b:
+        return True
+    la, lb = len(a), len(b)
+    if abs(la - lb) > 1:
+        return False
+    if la > lb:
+        a, b, la, lb = b, a, lb, la
+    i = 0
+    while i < la and a[i] == b[i]:
+        i += 1
+    return a[i:] == b[i + 1:] if la < lb else a[i + 1:] == b[i + 1:]
+
+
+def _excluded(column: str) -> bool:
+    from semantic_schema.schema_retrieval import identifier_tokens, normalise
+
+    return not identifier_tokens(column).isdisjoint(
+        {normalise(w) for w in _EXCLUDED_WORDS}
+    )
+
+
+def is_entity_column(name: str, type_: str) -> bool:
+    """Text column that can hold names / codes (not prose or secrets)."""
+    return any(t in type_.upper() for t in _TEXT_TYPES) and not _excluded(name)
+
+
+def add_values(table: str, column: str, values: Iterable[str]) -> None:
+    """
+    Add values for one column without rebuilding anything else.
+    Used by `refresh()` and handy when the app itself inserts new sites.
+    """
+    for v in values:
+        v = str(v).strip()
+        k = _key(v)
+        if (
+            not _MIN_LEN <= len(k) <= _MAX_LEN
+            or k.replace(" ", "").isdigit()
+            or k in _STOPWORDS
+        ):
+            continue
+        _exact.setdefault(k, set()).add((table, column, v))
+        if len(k) >= _MIN_FUZZY_LEN:
+            for d in _one_deletes(k):
+                _deletes.setdefault(d, set()).add(k)
+
+
+def _seed_from_samples() -> None:
+    """
+    No entity_index.json yet → use the `sample_values` of text columns in
+    schema_index.json so lookups work before the first full build.
+    """
+    try:
+        with _schema_path.open(encoding="utf-8") as fh:
+            schema: Dict[str, Dict] = json.load(fh)
+    except (OSError, json.JSONDecodeError) as err:
+        logging.warning("No entity seed from %s: %s", _schema_path, err)
+        return
+    for table, meta in schema.items():
+        for col in meta["columns"]:
+            if is_entity_column(col["name"], col["type"]):
+                add_values(table, col["name"], col.get("sample_values", []))
+
+
+def refresh(force: bool = False) -> bool:
+    """
+    (Re)load entity_index.json if it changed on disk.  Cheap enough to call
+    on every lookup – it is a single stat() when nothing changed.
+    An unreadable file keeps the current index (logged, retried on the
+    next change).
+    """
+    global _mtime
+    try:
+        mtime = _index_path.stat().st_mtime
+    except FileNotFoundError:
+        if _mtime is None:
+            _seed_from_samples()
+            _mtime = -1.0
+        return False
+    if not force and mtime == _mtime:
+        return False
+
+    try:
+        with _index_path.open(encoding="utf-8") as fh:
+            data: Dict[str, Dict] = json.load(fh)
+    except (OSError, json.JSONDecodeError) as err:
+        logging.warning("Keeping current entity index; %s unreadable: %s", _index_path, err)
+        if _mtime is None:                     # nothing loaded yet → samples
+            _seed_from_samples()
+        _mtime = mtime
+        return False
+
+    _exact.clear()
+    _deletes.clear()
+    for entry in data.values():
+        if not _excluded(entry["column"]):
+            add_values(entry["table"], entry["column"], entry.get("values", []))
+    _mtime = mtime
+    return True
+
+
+# ── 3. public helpers ─────────────────────────────────────────────────────
+def _match(term: str) -> Tuple[Set[Tuple[str, str, str]], bool]:
+    if term in _exact:
+        return _exact[term], True
+    if len(term) < _MIN_FUZZY_LEN:
+        return set(), False
+
+    keys = set(_deletes.get(term, ()))               # term = key minus 1 char
+    for d in _one_deletes(term):
+        if d in _exact:                              # term = key plus 1 char
+            keys.add(d)
+        keys |= _deletes.get(d, set())               # substitution
+    hits: Set[Tuple[str, str, str]] = set()
+    for k in keys:
+        if _within_one_edit(term, k):
+            hits |= _exact[k]
+    return hits, False
+
+
+def _column_rank(hit: Tuple[str, str, str]) -> Tuple[bool, bool, int, str, str]:
+    """Prefer *Name columns of master tables over log / audit copies."""
+    table, column, _ = hit
+    is_copy = bool(re.search(r"(Log|History|Audit|Remote)$", table))
+    return (is_copy, not column.endswith("Name"), len(table), table, column)
+
+
+def lookup(question: str) -> List[Binding]:
+    """
+    Map question words to (table, column, canonical value).
+    Longest n-gram wins; a word is bound at most once, to one column.
+    """
+    refresh()
+    if not _exact:
+        return []
+
+    from semantic_schema.schema_retrieval import normalise, schema_identifiers
+
+    words = re.findall(r"[a-z0-9]+", question.lower())
+    taken = [False] * len(words)
+    out: List[Binding] = []
+    for n in range(min(_MAX_NGRAM, len(words)), 0, -1):
+        for i in range(len(words) - n + 1):
+            if any(taken[i:i + n]):
+                continue
+            term = " ".join(words[i:i + n])
+            if n == 1 and (term in _STOPWORDS or normalise(term) in schema_identifiers()):
+                continue
+            hits, exact = _match(term)
+            columns = {(t, c) for t, c, _ in hits}
+            if not hits or len(columns) > _MAX_COLUMNS:
+                continue
+            taken[i:i + n] = [True] * n
+            t, c, v = min(hits, key=_column_rank)
+            score = (1.0 if exact else 0.6) / len(columns)
+            out.append(Binding(t, c, v, term, exact, score))
+    return out
+
+
+def describe(bindings: List[Binding]) -> str:
+    """Prompt lines such as  -- 'bhestan' means Site.Name = 'Bhestan'"""
+    return "\n".join(
+        f"-- '{b.term}' means {b.table}.{b.column} = '{b.value}'"
+        for b in bindings
+    )
+
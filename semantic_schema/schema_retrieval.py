@@ -12,6 +12,8 @@ import difflib
 from functools import lru_cache
 from typing import Any, Dict, List
 
+from semantic_schema import entity_index
+
 # ── 1. load once ──────────────────────────────────────────────────────────
 _schema_path = pathlib.Path("schema_index.json")
 if not _schema_path.exists():
@@ -31,26 +33,34 @@ def describe_table(table: str) -> List[Dict[str, Any]]:
 
 
 @lru_cache(maxsize=256)
-def _tokenise(text: str) -> set[str]:
+def tokenise(text: str) -> set[str]:
     return set(re.findall(r"[A-Za-z0-9_]+", text.lower()))
 
 
-def _normalise(tok: str) -> str:
+def normalise(tok: str) -> str:
     """
     crude stemmer – strips a trailing 's' and lower-cases
     """
     tok = tok.lower()
     return tok[:-1] if tok.endswith("s") else tok
 
+
+def identifier_tokens(name: str) -> set[str]:
+    """
+    'LocationName' → {'location', 'name', 'locationname'} (normalised)
+    """
+    parts = re.findall(r"[A-Z]?[a-z0-9]+|[A-Z]+(?![a-z])", name)
+    return {normalise(p) for p in parts} | {normalise(name)}
+
 def _bm25_score(q_tokens: set[str], table: str) -> int:
-    tbl_tok = {_normalise(table)}
+    tbl_tok = {normalise(table)}
     for col in describe_table(table):
-        tbl_tok.add(_normalise(col["name"]))
+        tbl_tok.add(normalise(col["name"]))
 
     # allow fuzzy 1-edit matches (e.g. pt101 ↔ pt_101)
     score = 0
     for q in q_tokens:
-        qn = _normalise(q)
+        qn = normalise(q)
         if qn in tbl_tok:
             score += 3
         elif difflib.get_close_matches(qn, tbl_tok, n=1, cutoff=0.8):
@@ -58,13 +68,37 @@ def _bm25_score(q_tokens: set[str], table: str) -> int:
     return score
 
 
-def find_relevant_tables(question: str, k: int = 100) -> List[str]:
+@lru_cache(maxsize=1)
+def schema_identifiers() -> frozenset[str]:
+    """Every normalised word of every table and column name."""
+    ids: set[str] = set()
+    for table, meta in SCHEMA_INDEX.items():
+        ids |= identifier_tokens(table)
+        for col in meta["columns"]:
+            ids |= identifier_tokens(col["name"])
+    return frozenset(ids)
+
+
+def find_relevant_tables(
+    question: str,
+    k: int = 100,
+    bindings: List[entity_index.Binding] | None = None,
+) -> List[str]:
     """
     Return top-k table names sorted by relevance.
+    Tables holding a literal named in the question (see entity_index) get a
+    boost of up to 5, scaled by how specific the match is; pass `bindings`
+    if you already looked them up.
     """
-    q_tokens = _tokenise(question)
+    q_tokens = tokenise(question)
+    if bindings is None:
+        bindings = entity_index.lookup(question)
+    boost: Dict[str, float] = {}
+    for b in bindings:
+        boost[b.table] = max(boost.get(b.table, 0.0), 5 * b.score)
     scored = [
-        (tbl, _bm25_score(q_tokens, tbl)) for tbl in SCHEMA_INDEX.keys()
+        (tbl, _bm25_score(q_tokens, tbl) + boost.get(tbl, 0.0))
+        for tbl in SCHEMA_INDEX.keys()
     ]
     scored.sort(key=lambda t: t[1], reverse=True)
     # keep only those with a non-zero score
@@ -0,0 +1,71 @@
+"""
+Run from the repo root (schema_index.json is read from the CWD):
+    python -m pytest -q tests
+"""
+import pytest
+
+from semantic_schema import entity_index
+
+
+@pytest.fixture
+def index(monkeypatch, tmp_path):
+    """Empty in-memory index that never touches entity_index.json."""
+    monkeypatch.setattr(entity_index, "_exact", {})
+    monkeypatch.setattr(entity_index, "_deletes", {})
+    monkeypatch.setattr(entity_index, "_mtime", None)
+    monkeypatch.setattr(entity_index, "_index_path", tmp_path / "entity_index.json")
+    monkeypatch.setattr(entity_index, "_schema_path", tmp_path / "missing.json")
+    entity_index.add_values("Site", "Name", ["Bhestan", "MB Power Cabin", "Surat"])
+    entity_index.add_values("Asset", "Code", ["03T"])
+    return entity_index
+
+
+def _bound(bindings):
+    return [(b.term, b.table, b.column, b.value, b.exact) for b in bindings]
+
+
+def test_exact_match(index):
+    assert _bound(index.lookup("give maximum current at bhestan")) == [
+        ("bhestan", "Site", "Name", "Bhestan", True)
+    ]
+    assert _bound(index.lookup("status of 03t")) == [
+        ("03t", "Asset", "Code", "03T", True)
+    ]
+
+
+@pytest.mark.parametrize("typo", ["bhestn", "bhesstan", "bhestam"])
+def test_one_edit_fuzzy_match(index, typo):
+    [b] = index.lookup(f"max current at {typo}")
+    assert (b.value, b.exact, b.term) == ("Bhestan", False, typo)
+
+
+def test_two_edits_and_short_codes_are_not_fuzzy(index):
+    assert index.lookup("max current at bhstn") == []
+    assert index.lookup("status of 03x") == []
+
+
+def test_longest_ngram_wins(index):
+    index.add_values("Asset", "Name", ["Power"])
+    assert _bound(index.lookup("assets at mb power cabin")) == [
+        ("mb power cabin", "Site", "Name", "MB Power Cabin", True)
+    ]
+
+
+def test_stopwords_and_schema_identifiers_are_not_bound(index):
+    index.add_values("Role", "Title", ["Users", "Show", "Zone"])
+    assert index.lookup("show users per zone") == []
+
+
+def test_entity_columns_use_whole_words():
+    assert entity_index.is_entity_column("PointMachine", "NVARCHAR(50)")
+    assert entity_index.is_entity_column("Value", "NVARCHAR(50)")
+    assert not entity_index.is_entity_column("MACId", "NVARCHAR(50)")
+    assert not entity_index.is_entity_column("IpAddress", "NVARCHAR(50)")
+    assert not entity_index.is_entity_column("PasswordHash", "NVARCHAR(50)")
+    assert not entity_index.is_entity_column("Name", "INTEGER")
+
+
+def test_unreadable_file_keeps_current_index(index):
+    index._index_path.write_text('{"Site.Name": {"table": "Si', encoding="utf-8")
+    assert index.refresh() is False
+    assert index.lookup("max current at surat")[0].value == "Surat"
@@ -0,0 +1,75 @@
+"""
+Run from the repo root (schema_index.json is read from the CWD):
+    python -m pytest -q tests
+"""
+import pytest
+
+from llm import prompt_utils
+from semantic_schema import schema_retrieval
+from semantic_schema.entity_index import Binding
+
+
+class _CharTokenizer:
+    """One token per character – additive, so budgets can be checked exactly."""
+
+    def __call__(self, text, add_special_tokens=False):
+        return {"input_ids": list(text)}
+
+
+@pytest.fixture(autouse=True)
+def fake_tokenizer(monkeypatch):
+    monkeypatch.setattr(prompt_utils, "get_tokenizer", lambda: _CharTokenizer())
+    prompt_utils._table_fragments.cache_clear()
+    yield
+    prompt_utils._table_fragments.cache_clear()
+
+
+def _column_order(snippet: str, table: str) -> list[str]:
+    line = next(ln for ln in snippet.splitlines() if ln.startswith(f"-- {table}("))
+    body = line[len(f"-- {table}("):-1]
+    return [part.split()[0] for part in body.split(", ")]
+
+
+@pytest.mark.parametrize("budget", [40, 120, 400])
+def test_stays_within_budget(budget):
+    snippet = prompt_utils.build_schema_snippet(
+        ["Site", "Asset"], "give all site names", budget=budget
+    )
+    assert len(snippet) <= budget
+
+
+def test_bound_column_ranks_first():
+    bound = Binding("Site", "MACId", "AA:BB", "aabb", True, 1.0)
+    snippet = prompt_utils.build_schema_snippet(
+        ["Site"], "show it", budget=60, bindings=[bound]
+    )
+    assert "MACId" in _column_order(snippet, "Site")
+
+
+def test_hints_capped_at_half_the_budget():
+    bindings = [
+        Binding("Site", "Name", f"Site {i}", f"site{i}", True, 1.0) for i in range(20)
+    ]
+    budget = 300
+    snippet = prompt_utils.build_schema_snippet(
+        ["Site"], "site0", budget=budget, bindings=bindings
+    )
+    hints = [ln for ln in snippet.splitlines() if "' means " in ln]
+    assert 0 < len(hints) < len(bindings)
+    assert len("\n\n" + "\n".join(hints)) <= budget // 2
+    assert len(snippet) <= budget
+
+
+def test_output_keeps_schema_order():
+    snippet = prompt_utils.build_schema_snippet(
+        ["Site"], "give site name and zone", budget=200
+    )
+    picked = _column_order(snippet, "Site")
+    schema_order = [c["name"] for c in schema_retrieval.describe_table("Site")]
+    assert picked == sorted(picked, key=schema_order.index)
+    assert "Name" in picked
+
+
+def test_nothing_fits_raises():
+    with pytest.raises(ValueError):
+        prompt_utils.build_schema_snippet(["Site"], "site", budget=3)
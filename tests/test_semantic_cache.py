@@ -0,0 +1,78 @@
+"""
+Run from the repo root (schema_index.json is read from the CWD):
+    python -m pytest -q tests
+"""
+import importlib
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("SEMANTIC_CACHE_PATH", str(tmp_path / "cache.pkl"))
+    from core import semantic_cache
+
+    semantic_cache = importlib.reload(semantic_cache)
+    # every question embeds identically → only the signature can refuse a hit
+    vec = np.ones(semantic_cache._DIM, dtype=np.float32)
+    monkeypatch.setattr(semantic_cache, "_embed", lambda q: vec / np.linalg.norm(vec))
+    return semantic_cache
+
+
+def test_unknown_site_names_do_not_share_sql(cache):
+    cache.store("give maximum current at bhestan", "SQL_BHESTAN")
+    assert cache.lookup("give maximum current at surat") is None
+    assert cache.lookup("give max current at bhestan") == "SQL_BHESTAN"
+
+
+@pytest.mark.parametrize(
+    "cached, asked",
+    [
+        ("max current at bhestan", "min current at bhestan"),
+        ("list sites", "count sites"),
+        ("top five assets", "top ten assets"),
+    ],
+)
+def test_operator_mismatch_is_a_miss(cache, cached, asked):
+    cache.store(cached, "SQL")
+    assert cache.lookup(asked) is None
+
+
+@pytest.mark.parametrize(
+    "cached, asked",
+    [
+        ("max current at bhestan", "max voltage at bhestan"),
+        ("list all sites", "list all zones"),
+        ("list all sites", "list all assets"),
+    ],
+)
+def test_different_column_or_table_is_a_miss(cache, cached, asked):
+    cache.store(cached, "SQL")
+    assert cache.lookup(asked) is None
+
+
+def test_different_group_by_is_a_miss(cache):
+    cache.store("count alerts per site", "SQL_PER_SITE")
+    assert cache.lookup("count alerts per zone") is None
+    assert cache.lookup("count alerts for each site") == "SQL_PER_SITE"
+
+
+def test_paraphrase_hit_and_stats(cache):
+    cache.store("give all site names", "SELECT Name FROM Site")
+    assert cache.lookup("list all sites") == "SELECT Name FROM Site"
+    assert cache.lookup("how many sites") is None
+    assert cache.stats()["hit_rate"] == 0.5
+
+
+def test_discard_and_persistence(cache):
+    cache.store("give all site names", "S1")
+    cache.store("count assets", "S2")
+    assert cache.discard("list all sites")
+    assert cache.lookup("give all site names") is None
+    cache.save()
+
+    reloaded = importlib.reload(cache)
+    assert reloaded.stats()["entries"] == 1
+    assert reloaded._slot_of == {"count assets": 0}